@@ -4,19 +4,28 @@ import os
 import csv
 
 
+_DIXON_RECORD = None
+
+
 def dixon_record():
-    record = os.path.join(os.getcwd(), 'src', 'data', 'dixon_data.csv')
-    with open(record, 'r') as file:
-        reader = csv.reader(file)
-        record = [row for row in reader]
-    return record
+    """Read the dixon record as a lookup table keyed by (patient, study).
+
+    The CSV is parsed once per run and cached at module level.
+    """
+    global _DIXON_RECORD
+    if _DIXON_RECORD is None:
+        record = os.path.join(os.getcwd(), 'src', 'data', 'dixon_data.csv')
+        with open(record, 'r') as file:
+            reader = csv.reader(file)
+            rows = [row for row in reader]
+        _DIXON_RECORD = {(row[1], row[2]): row[5] for row in rows}
+    return _DIXON_RECORD
 
 
 def dixon_series_desc(record, patient, study):
-    for row in record:
-        if row[1] == patient:
-            if row[2]==study:
-                return row[5]
-    raise ValueError(
-        f'Patient {patient}, study {study}: not found in src/data/dixon_data.csv'
-    )
\ No newline at end of file
+    try:
+        return record[(patient, study)]
+    except KeyError:
+        raise ValueError(
+            f'Patient {patient}, study {study}: not found in src/data/dixon_data.csv'
+        )
@@ -1,8 +1,20 @@
 import os
 from datetime import date
+from types import MappingProxyType
 
 import pandas as pd
 
+
+# (parameter, body_part, image, category) per Antaros parameter name
+# Read-only so callers cannot mutate the shared table
+ANTAROS_PARAMS = MappingProxyType({
+    'LIVER FAT': ('liver-r2_star-mean-pdff', 'liver', 'r2_star', 'mean'),
+    'LIVER R2star': ('liver-r2_star-mean-R2star', 'liver', 'r2_star', 'mean'),
+    'VAT': ('visceral_adipose_tissue-shape-area', 'visceral_adipose_tissue', 'mask', 'shape'),
+    'PANCREAS FAT': ('pancreas-r2_star-mean-pdff', 'pancreas', 'r2_star', 'mean'),
+})
+
+
 def antaros_to_redcap(input_file, output_path):
 
     # Read original table
@@ -20,33 +32,14 @@ def antaros_to_redcap(input_file, output_path):
     table['harmonized_id'] = harmonized_id
     table = table.drop('Subject', axis=1)
 
-    # Build parameter column
+    # Build parameter column via a single lookup per row
     parameter = []
     body_part = []
     biomarker = []
     image = []
     category = []
     for idx, row in table.iterrows():
-        if row['Parameter Name'] == 'LIVER FAT':
-            p = 'liver-r2_star-mean-pdff'
-            b = 'liver'
-            im = 'r2_star'
-            cat = 'mean'
-        elif row['Parameter Name'] == 'LIVER R2star':
-            p = 'liver-r2_star-mean-R2star'
-            b = 'liver'
-            im = 'r2_star'
-            cat = 'mean'
-        elif row['Parameter Name'] == 'VAT':
-            p = 'visceral_adipose_tissue-shape-area'
-            b = 'visceral_adipose_tissue'
-            im = 'mask'
-            cat = 'shape'
-        elif row['Parameter Name'] == 'PANCREAS FAT':
-            p = 'pancreas-r2_star-mean-pdff'
-            b = 'pancreas'
-            im = 'r2_star'
-            cat = 'mean'
+        p, b, im, cat = ANTAROS_PARAMS[row['Parameter Name']]
         parameter.append(p)
         body_part.append(b)
         biomarker.append(p.split('-')[-1])
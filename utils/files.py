@@ -1,24 +1,49 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from tqdm import tqdm
 
 
-def copy_new_files(src, dst):
-    """Copy data from one directory to another without overwriting 
+def _copy_file(src_file, dest_file):
+    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    shutil.copy2(src_file, dest_file)
+
+
+def copy_new_files(src, dst, max_workers=None):
+    """Copy data from one directory to another without overwriting
     those that already exist.
+
+    Files are independent of each other so they are copied in parallel.
     """
+    # Collect all existing destination files in one walk, so the
+    # check below is a set lookup instead of a stat call per file.
+    existing = set()
+    for root, _, files in os.walk(dst):
+        rel_path = os.path.relpath(root, dst)
+        for file in files:
+            existing.add(os.path.normpath(os.path.join(rel_path, file)))
+
     # Collect all files to check
     files_to_copy = []
     for root, _, files in os.walk(src):
         rel_path = os.path.relpath(root, src)
         dest_root = os.path.join(dst, rel_path)
         for file in files:
+            if os.path.normpath(os.path.join(rel_path, file)) in existing:
+                continue
             src_file = os.path.join(root, file)
             dest_file = os.path.join(dest_root, file)
-            if not os.path.exists(dest_file):
-                files_to_copy.append((src_file, dest_file))
+            files_to_copy.append((src_file, dest_file))
 
-    # Copy with progress bar
-    for src_file, dest_file in tqdm(files_to_copy, desc="Copying files", unit="file"):
-        os.makedirs(os.path.dirname(dest_file), exist_ok=True)
-        shutil.copy2(src_file, dest_file)
+    # Copy in parallel with progress bar
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_copy_file, src_file, dest_file)
+            for src_file, dest_file in files_to_copy
+        ]
+        for future in tqdm(
+            as_completed(futures), total=len(futures),
+            desc="Copying files", unit="file",
+        ):
+            future.result()
@@ -1,5 +1,5 @@
 import os
-import shutil
+import tempfile
 
 import numpy as np
 import matplotlib
@@ -34,51 +34,47 @@ def movie_overlay(img, rois, file):
     colors = get_distinct_colors(rois, colormap='tab20')
 
     # Directory to store temporary frames
-    tmp = os.path.join(os.getcwd(), 'tmp')
-    os.makedirs(tmp, exist_ok=True)
-    filenames = []
+    with tempfile.TemporaryDirectory() as tmp:
+        filenames = []
 
-    # Generate and save a sequence of plots
-    for i in tqdm(range(img.shape[2]), desc='Building animation..'):
+        # Generate and save a sequence of plots
+        for i in tqdm(range(img.shape[2]), desc='Building animation..'):
 
-        # Set up figure
-        fig, ax = plt.subplots(
-            figsize=(5, 5),
-            dpi=300,
-        )
+            # Set up figure
+            fig, ax = plt.subplots(
+                figsize=(5, 5),
+                dpi=300,
+            )
 
-        # Display the background image
-        ax.imshow(img[:,:,i].T, cmap='gray', interpolation='none', vmin=0, vmax=np.mean(img) + 2 * np.std(img))
-
-        # Overlay each mask
-        for mask, color in zip([m.astype(bool) for m in rois.values()], colors):
-            rgba = np.zeros((img.shape[0], img.shape[1], 4), dtype=float)
-            for c in range(4):  # RGBA
-                rgba[..., c] = mask[:,:,i] * color[c]
-            ax.imshow(rgba.transpose((1,0,2)), interpolation='none')
+            # Display the background image
+            ax.imshow(img[:,:,i].T, cmap='gray', interpolation='none', vmin=0, vmax=np.mean(img) + 2 * np.std(img))
 
-        # Save eachg image to a tmp file
-        fname = os.path.join(tmp, f'frame_{i}.png')
-        fig.savefig(fname)
-        filenames.append(fname)
-        plt.close(fig)
+            # Overlay each mask
+            for mask, color in zip([m.astype(bool) for m in rois.values()], colors):
+                rgba = np.zeros((img.shape[0], img.shape[1], 4), dtype=float)
+                for c in range(4):  # RGBA
+                    rgba[..., c] = mask[:,:,i] * color[c]
+                ax.imshow(rgba.transpose((1,0,2)), interpolation='none')
 
-    # Create GIF
-    print('Creating movie')
-    gif = os.path.join(tmp, 'movie.gif')
-    with imageio.get_writer(gif, mode="I", duration=0.2) as writer:
-        for fname in filenames:
-            image = imageio.imread(fname)
-            writer.append_data(image)
+            # Save eachg image to a tmp file
+            fname = os.path.join(tmp, f'frame_{i}.png')
+            fig.savefig(fname)
+            filenames.append(fname)
+            plt.close(fig)
 
-    # Load gif
-    clip = VideoFileClip(gif)
+        # Create GIF
+        print('Creating movie')
+        gif = os.path.join(tmp, 'movie.gif')
+        with imageio.get_writer(gif, mode="I", duration=0.2) as writer:
+            for fname in filenames:
+                image = imageio.imread(fname)
+                writer.append_data(image)
 
-    # Save as MP4
-    clip.write_videofile(file, codec='libx264')
+        # Load gif
+        clip = VideoFileClip(gif)
 
-    # Clean up temporary files
-    shutil.rmtree(tmp)
+        # Save as MP4
+        clip.write_videofile(file, codec='libx264')
 
 
 def mosaic_overlay(img, rois, file, colormap='tab20', aspect_ratio=16/9, margin=[15,5,2]):
@@ -96,25 +92,16 @@ def mosaic_overlay(img, rois, file, colormap='tab20', aspect_ratio=16/9, margin=
     if np.sum(all_masks)==0:
         raise ValueError('Empty masks')
     
-    # Find corners of cropped mask
-    for x0 in range(all_masks.shape[0]):
-        if np.sum(all_masks[x0,:,:]) > 0:
-            break
-    for x1 in range(all_masks.shape[0]-1, -1, -1):
-        if np.sum(all_masks[x1,:,:]) > 0:
-            break
-    for y0 in range(all_masks.shape[1]):
-        if np.sum(all_masks[:,y0,:]) > 0:
-            break
-    for y1 in range(all_masks.shape[1]-1, -1, -1):
-        if np.sum(all_masks[:,y1,:]) > 0:
-            break
-    for z0 in range(all_masks.shape[2]):
-        if np.sum(all_masks[:,:,z0]) > 0:
-            break
-    for z1 in range(all_masks.shape[2]-1, -1, -1):
-        if np.sum(all_masks[:,:,z1]) > 0:
-            break
+    # Find corners of cropped mask from the nonzero profile along each axis
+    profile_x = np.any(all_masks, axis=(1,2))
+    profile_y = np.any(all_masks, axis=(0,2))
+    profile_z = np.any(all_masks, axis=(0,1))
+    x0 = int(np.argmax(profile_x))
+    x1 = int(all_masks.shape[0] - 1 - np.argmax(profile_x[::-1]))
+    y0 = int(np.argmax(profile_y))
+    y1 = int(all_masks.shape[1] - 1 - np.argmax(profile_y[::-1]))
+    z0 = int(np.argmax(profile_z))
+    z1 = int(all_masks.shape[2] - 1 - np.argmax(profile_z[::-1]))
 
     # Add in the margins       
     x0 = x0-margin[0] if x0-margin[0]>=0 else 0
@@ -1,14 +1,93 @@
-import os
 import logging
-import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import scipy.ndimage as ndi
-from scipy.interpolate import interpn
 import skimage
-import vreg
+import SimpleITK as sitk
 from radiomics import featureextractor
 
+try:
+    # Optional: C++ union-find labelling, much faster than ndi.label
+    import cc3d
+except ImportError:
+    cc3d = None
+
+try:
+    # Optional: multi-threaded 3D Euclidean distance transform
+    import edt
+except ImportError:
+    edt = None
+
+
+def _label(array):
+    """Label connected components (6-connectivity, as in ndi.label)."""
+    if cc3d is not None:
+        return cc3d.connected_components(
+            np.asarray(array, dtype=np.uint8), connectivity=6, return_N=True,
+        )
+    return ndi.label(array)
+
+
+def _distance_transform(mask):
+    """Euclidean distance transform of a binary mask."""
+    if edt is not None:
+        return edt.edt(np.ascontiguousarray(mask, dtype=np.uint8))
+    return ndi.distance_transform_edt(mask)
+
+
+def _sitk_image(values, affine):
+    """Convert a volume array and its affine into an in-memory SimpleITK image.
+
+    Matches what writing the volume to NIfTI with vreg and reading it back
+    with SimpleITK would produce: the array transposed to (z,y,x) and the
+    affine split into spacing, direction and origin. No axis flip is
+    applied - vreg's RAS conversion on write and SimpleITK's LPS
+    conversion on read cancel out, so the round-trip geometry equals the
+    affine as-is.
+    """
+    img = sitk.GetImageFromArray(np.transpose(np.asarray(values), (2,1,0)))
+    affine = np.asarray(affine, dtype=float)
+    spacing = np.linalg.norm(affine[:3,:3], axis=0)
+    direction = affine[:3,:3] / spacing
+    img.SetSpacing(tuple(spacing))
+    img.SetDirection(tuple(direction.ravel()))
+    img.SetOrigin(tuple(affine[:3,3]))
+    return img
+
+
+# TODO: try without first order
+# glcm seems to fail a lot so is left out
+# _TEXTURE_CLASSES = ['firstorder', 'glcm', 'glrlm', 'glszm', 'gldm', 'ngtdm']
+_TEXTURE_CLASSES = ['firstorder', 'glrlm', 'glszm', 'gldm', 'ngtdm']
+
+_shape_extractor = None
+_texture_extractor = None
+
+
+def _get_shape_extractor():
+    """Configured shape extractor, built once and reused across calls."""
+    global _shape_extractor
+    if _shape_extractor is None:
+        _shape_extractor = featureextractor.RadiomicsFeatureExtractor()
+        _shape_extractor.disableAllFeatures()
+        _shape_extractor.enableFeatureClassByName('shape')
+    return _shape_extractor
+
+
+def _get_texture_extractor():
+    """Configured texture extractor, built once and reused across calls."""
+    global _texture_extractor
+    if _texture_extractor is None:
+        _texture_extractor = featureextractor.RadiomicsFeatureExtractor()
+        _texture_extractor.disableAllFeatures()
+        for cl in _TEXTURE_CLASSES:
+            _texture_extractor.enableFeatureClassByName(cl)
+        # _texture_extractor.enableImageTypeByName('Wavelet')
+        # _texture_extractor.enableImageTypeByName('LoG', {'sigma': [1.0, 1.0, 1.0]})
+        # _texture_extractor.enableImageTypeByName('Gradient')
+    return _texture_extractor
+
 
 def largest_cluster(array:np.ndarray)->np.ndarray:
     """Given a mask array, return a new mask array containing only the largest cluster.
@@ -20,11 +99,15 @@ def largest_cluster(array:np.ndarray)->np.ndarray:
         np.ndarray: mask array with only a single connect cluster of pixels.
     """
     # Label all features in the array
-    label_img, cnt = ndi.label(array)
-    # Find the label of the largest feature
-    labels = range(1,cnt+1)
-    size = [np.count_nonzero(label_img==l) for l in labels]
-    max_label = labels[size.index(np.amax(size))]
+    label_img, cnt = _label(array)
+    # An empty mask has no clusters - fail loudly rather than letting
+    # argmax fall through to the background label (an all-True mask)
+    if cnt == 0:
+        raise ValueError('Cannot extract the largest cluster of an empty mask')
+    # Find the label of the largest feature in a single pass
+    sizes = np.bincount(label_img.ravel())
+    sizes[0] = 0 # ignore the background
+    max_label = int(sizes.argmax())
     # Return a mask corresponding to the largest feature
     return label_img==max_label
 
@@ -34,12 +117,9 @@ def largest_cluster_label(array:np.ndarray)->np.ndarray:
     largest cluster for each label.
     """
     output_array = np.zeros(array.shape, dtype=np.int16)
-    for label_value in np.unique(array):
-        if label_value == 0:
-            continue
-        mask = np.zeros(array.shape)
-        mask[array==label_value] = 1
-        mask = largest_cluster(mask)
+    labels = np.unique(array)
+    for label_value in labels[labels != 0]:
+        mask = largest_cluster(array==label_value)
         output_array[mask] = label_value
     return output_array
 
@@ -94,9 +174,6 @@ def interpolate3d_isotropic(array, spacing, isotropic_spacing=None):
     Lx = (nx-1)*spacing[0]
     Ly = (ny-1)*spacing[1]
     Lz = (nz-1)*spacing[2]
-    x = np.linspace(0, Lx, nx)
-    y = np.linspace(0, Ly, ny)
-    z = np.linspace(0, Lz, nz)
 
     # Get x, y, z coordinates for isotropic array
     nxi = 1 + np.floor(Lx/isotropic_spacing)
@@ -110,8 +187,17 @@ def interpolate3d_isotropic(array, spacing, isotropic_spacing=None):
     zi = np.linspace(0, Lzi, nzi.astype(int))
 
     # Interpolate to isotropic
-    ri = np.meshgrid(xi,yi,zi, indexing='ij')
-    array = interpn((x,y,z), array, np.stack(ri, axis=-1))
+    # The source grid is uniform, so target positions are fractional indices
+    # and scipy's compiled trilinear sampler can be used directly. This avoids
+    # the generic n-D dispatch (and extra coordinate stacking) of interpn.
+    # float32 is ample for mask data and halves the memory traffic.
+    # Broadcast the three 1d coordinate vectors into one preallocated block
+    # instead of materializing full grids with meshgrid.
+    ri = np.empty((3,) + (xi.size, yi.size, zi.size), dtype=np.float32)
+    ri[0] = (xi/spacing[0])[:, None, None]
+    ri[1] = (yi/spacing[1])[None, :, None]
+    ri[2] = (zi/spacing[2])[None, None, :]
+    array = ndi.map_coordinates(np.asarray(array, dtype=np.float32), ri, order=1)
     return array, isotropic_spacing
 
 
@@ -122,18 +208,22 @@ def volume_features(vol, roi):
     # Scale array in the range [0,1] so it can be treated as mask
     # Motivation: the function is intended for mask arrays but this will make
     # sure the results are meaningful even if non-binary arrays are provided.
-    max = np.amax(arr)
-    min = np.amin(arr)
-    arr -= min
-    arr /= max-min
+    mx = np.amax(arr)
+    mn = np.amin(arr)
+    # The subtraction makes one fresh buffer (so the caller's volume is left
+    # untouched), the division then runs in place on that buffer.
+    arr = arr - mn
+    arr /= mx-mn
 
     # Add zeropadding at the boundary slices for masks that extend to the edge
     # Motivation: this could have some effect if surfaces are extracted - could create issues
     # if the values extend right up to the boundary of the slab.
-    shape = list(arr.shape)
-    shape[-1] = shape[-1] + 2*4
-    array = np.zeros(shape)
-    array[:,:,4:-4] = arr
+    # Only pay for the padded copy when the mask actually reaches the outer
+    # slices; with 4 empty slices on either end the padding has no effect.
+    if np.any(arr[:,:,:4] != 0) or np.any(arr[:,:,-4:] != 0):
+        array = np.pad(arr, ((0,0), (0,0), (4,4)))
+    else:
+        array = arr
 
     # Get voxel dimensions from the affine
     # We are assuming here the voxel dimensions are in mm.
@@ -144,16 +234,23 @@ def volume_features(vol, roi):
     volume = nr_of_voxels * voxel_volume
 
     # Surface properties - for now only extracting surface area
-    try:
-        # Note: this is smoothing the surface first - not tested in depth whether this is necessary or helpful.
-        # It does appear to make a big difference on surface area so should be looked at more carefully.
-        smooth_array = ndi.gaussian_filter(array, 1.0)
-        verts, faces, _, _ = skimage.measure.marching_cubes(smooth_array, spacing=spacing, level=0.5, step_size=1.0)
-    except:
-        # If a mask has too few points, smoothing can reduce the max to below 0.5. Use the midpoint in that case
-        # Note this may work in general but 0.5 has been used for previous data collection so keep that as default
-        smooth_array = ndi.gaussian_filter(array, 1.0)
-        verts, faces, _, _ = skimage.measure.marching_cubes(smooth_array, spacing=spacing, level=np.mean(smooth_array), step_size=1.0)
+    # The isosurface lives in a narrow band around the mask, so smooth and
+    # march only over the mask's bounding box plus a 5-voxel margin (wide
+    # enough for the sigma=1 smoothing kernel and the 0.5 level set). The
+    # extracted surface, and hence its area, is the same as on the full slab.
+    surf_bbox = ndi.find_objects(np.asarray(array != 0, dtype=np.uint8))[0]
+    surf_bbox = tuple(
+        slice(max(s.start-5, 0), min(s.stop+5, n))
+        for s, n in zip(surf_bbox, array.shape)
+    )
+    # Note: this is smoothing the surface first - not tested in depth whether this is necessary or helpful.
+    # It does appear to make a big difference on surface area so should be looked at more carefully.
+    smooth_array = ndi.gaussian_filter(array[surf_bbox], 1.0)
+    # If a mask has too few points, smoothing can reduce the max to below 0.5
+    # and the 0.5 level set is empty - use the midpoint in that case.
+    # Note the midpoint may work in general but 0.5 has been used for previous data collection so keep that as default
+    level = 0.5 if np.amax(smooth_array) > 0.5 else np.mean(smooth_array)
+    verts, faces, _, _ = skimage.measure.marching_cubes(smooth_array, spacing=spacing, level=level, step_size=1.0)
     surface_area = skimage.measure.mesh_surface_area(verts, faces)
 
     # Interpolate to isotropic for non-isotropic voxels
@@ -167,122 +264,112 @@ def volume_features(vol, roi):
         isotropic_voxel_volume = voxel_volume
 
     # Get volume properties - mostly from region_props, except for compactness and depth
-    array = np.round(array).astype(np.int16)
+    # uint8 is enough for a 0/1 mask and halves the bytes regionprops
+    # and the distance transform have to stream through
+    array = (array > 0.5).astype(np.uint8)
+
+    # regionprops and the distance transform only see voxels inside the
+    # mask's bounding box (plus a one-voxel zero border for the distance
+    # transform), so crop once and run both on the crop. Every property
+    # read below is invariant under the crop.
+    bbox = ndi.find_objects(array)[0]
+    bbox = tuple(
+        slice(max(s.start-1, 0), min(s.stop+1, n))
+        for s, n in zip(bbox, array.shape)
+    )
+    array = array[bbox]
     region_props_3D = skimage.measure.regionprops(array)[0]
 
+    # Fetch each property once - regionprops computes lazily on access
+    equivalent_diameter = region_props_3D['equivalent_diameter_area']
+    inertia_eigvals = region_props_3D['inertia_tensor_eigvals']
+
     # Calculate 'compactness' (our definition) - define as volume to surface ratio
     # expressed as a percentage of the volume-to-surface ration of an equivalent sphere.
     # The sphere is the most compact of all shapes, i.e. it has the largest volume to surface area ratio,
     # so this is guaranteed to be between 0 and 100%
-    radius = region_props_3D['equivalent_diameter_area']*isotropic_spacing/2 # mm
+    radius = equivalent_diameter*isotropic_spacing/2 # mm
     v2s = volume/surface_area # mm
     v2s_equivalent_sphere = radius/3 # mm
     compactness = 100 * v2s/v2s_equivalent_sphere # %
 
-    # Fractional anisotropy - in analogy with FA in diffusion 
-    m0 = region_props_3D['inertia_tensor_eigvals'][0]
-    m1 = region_props_3D['inertia_tensor_eigvals'][1]
-    m2 = region_props_3D['inertia_tensor_eigvals'][2]
+    # Fractional anisotropy - in analogy with FA in diffusion
+    m0, m1, m2 = inertia_eigvals
     m = (m0 + m1 + m2)/3 # average moment of inertia (trace of the inertia tensor)
     FA = np.sqrt(3/2) * np.sqrt((m0-m)**2 + (m1-m)**2 + (m2-m)**2) / np.sqrt(m0**2 + m1**2 + m2**2)
 
     # Measure maximum depth (our definition)
-    distance = ndi.distance_transform_edt(array)
+    # Only the maximum of the distance map is used and the array is already
+    # cropped to the bounding box with a zero border, so the maximum is the
+    # same as on the full slab.
+    distance = _distance_transform(array)
     max_depth = np.amax(distance)
 
-    # Adding a try/except around each line as some of these fail (math error) for masks with limited non-zero values
+    # Unit conversions shared by multiple features below (mm -> cm, mm^3 -> mL)
+    spacing_cm = isotropic_spacing/10
+    spacing_cm2 = isotropic_spacing**2/100
+    voxel_volume_ml = isotropic_voxel_volume/1000
+
+    # One entry per biomarker: (key suffix, label, unit, value callable).
+    # Values are computed lazily inside the loop because some of these fail
+    # (math error) for masks with limited non-zero values.
+    features = [
+        ('surface_area', 'Surface area', 'cm^2',
+            lambda: surface_area/100),
+        ('volume', 'Volume', 'mL',
+            lambda: volume/1000),
+        ('bounding_box_volume', 'Bounding box volume', 'mL',
+            lambda: region_props_3D['area_bbox']*voxel_volume_ml),
+        ('convex_hull_volume', 'Convex hull volume', 'mL',
+            lambda: region_props_3D['area_convex']*voxel_volume_ml),
+        ('volume_of_holes', 'Volume of holes', 'mL',
+            lambda: (region_props_3D['area_filled']-region_props_3D['area'])*voxel_volume_ml),
+        ('extent', 'Extent', '%',   # Percentage of bounding box filled
+            lambda: region_props_3D['extent']*100),
+        ('solidity', 'Solidity', '%',   # Percentage of convex hull filled
+            lambda: region_props_3D['solidity']*100),
+        ('compactness', 'Compactness', '%',
+            lambda: compactness),
+        ('long_axis_length', 'Long axis length', 'cm',
+            lambda: region_props_3D['axis_major_length']*spacing_cm),
+        ('short_axis_length', 'Short axis length', 'cm',
+            lambda: region_props_3D['axis_minor_length']*spacing_cm),
+        ('equivalent_diameter', 'Equivalent diameter', 'cm',
+            lambda: equivalent_diameter*spacing_cm),
+        ('maximum_depth', 'Maximum depth', 'cm',
+            lambda: max_depth*spacing_cm),
+        ('primary_moment_of_inertia', 'Primary moment of inertia', 'cm^2',
+            lambda: m0*spacing_cm2),
+        ('second_moment_of_inertia', 'Second moment of inertia', 'cm^2',
+            lambda: m1*spacing_cm2),
+        ('third_moment_of_inertia', 'Third moment of inertia', 'cm^2',
+            lambda: m2*spacing_cm2),
+        ('mean_moment_of_inertia', 'Mean moment of inertia', 'cm^2',
+            lambda: m*spacing_cm2),
+        ('fractional_anisotropy_of_inertia', 'Fractional anisotropy of inertia', '%',
+            lambda: 100*FA),
+        ('volume_qc', 'Volume QC', 'mL',
+            lambda: region_props_3D['area']*voxel_volume_ml),
+        # Taking this out for now - computation uses > 32GB of memory for large masks
+        # ('longest_caliper_diameter', 'Longest caliper diameter', 'cm',
+        #     lambda: region_props_3D['feret_diameter_max']*spacing_cm),
+    ]
     data = {}
-    try:
-        data[f'{roi}-shape_ski-surface_area'] = [surface_area/100, f'Surface area ({roi})', 'cm^2', 'float']
-    except Exception as e:
-        logging.error(f"Error computing surface area ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-volume'] = [volume/1000, f'Volume ({roi})', 'mL', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Volume ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-bounding_box_volume'] = [region_props_3D['area_bbox']*isotropic_voxel_volume/1000, f'Bounding box volume ({roi})', 'mL', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Bounding box volume ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-convex_hull_volume'] = [region_props_3D['area_convex']*isotropic_voxel_volume/1000, f'Convex hull volume ({roi})', 'mL', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Convex hull volume ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-volume_of_holes'] = [(region_props_3D['area_filled']-region_props_3D['area'])*isotropic_voxel_volume/1000, f'Volume of holes ({roi})', 'mL', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Volume of holes ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-extent'] = [region_props_3D['extent']*100, f'Extent ({roi})', '%', 'float']    # Percentage of bounding box filled
-    except Exception as e:
-        logging.error(f"Error computing Extent ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-solidity'] = [region_props_3D['solidity']*100, f'Solidity ({roi})', '%', 'float']   # Percentage of convex hull filled
-    except Exception as e:
-        logging.error(f"Error computing Solidity ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-compactness'] = [compactness, f'Compactness ({roi})', '%', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Compactness ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-long_axis_length'] = [region_props_3D['axis_major_length']*isotropic_spacing/10, f'Long axis length ({roi})', 'cm', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Long axis length ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-short_axis_length'] = [region_props_3D['axis_minor_length']*isotropic_spacing/10, f'Short axis length ({roi})', 'cm', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Short axis length ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-equivalent_diameter'] = [region_props_3D['equivalent_diameter_area']*isotropic_spacing/10, f'Equivalent diameter ({roi})', 'cm', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Equivalent diameter ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-maximum_depth'] = [max_depth*isotropic_spacing/10, f'Maximum depth ({roi})', 'cm', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Maximum depth ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-primary_moment_of_inertia'] = [region_props_3D['inertia_tensor_eigvals'][0]*isotropic_spacing**2/100, f'Primary moment of inertia ({roi})', 'cm^2', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Primary moment of inertia ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-second_moment_of_inertia'] = [region_props_3D['inertia_tensor_eigvals'][1]*isotropic_spacing**2/100, f'Second moment of inertia ({roi})', 'cm^2', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Second moment of inertia ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-third_moment_of_inertia'] = [region_props_3D['inertia_tensor_eigvals'][2]*isotropic_spacing**2/100, f'Third moment of inertia ({roi})', 'cm^2', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Third moment of inertia ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-mean_moment_of_inertia'] = [m*isotropic_spacing**2/100, f'Mean moment of inertia ({roi})', 'cm^2', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Mean moment of inertia ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-fractional_anisotropy_of_inertia'] = [100*FA, f'Fractional anisotropy of inertia ({roi})', '%', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Fractional anisotropy of inertia ({roi}): {e}")
-    try:
-        data[f'{roi}-shape_ski-volume_qc'] = [region_props_3D['area']*isotropic_voxel_volume/1000, f'Volume QC ({roi})', 'mL', 'float']
-    except Exception as e:
-        logging.error(f"Error computing Volume QC ({roi}): {e}")
-    # Taking this out for now - computation uses > 32GB of memory for large masks
-    # data[f'{roi}_ski_longest_caliper_diameter'] = [region_props_3D['feret_diameter_max']*isotropic_spacing/10, f'Longest caliper diameter ({roi})', 'cm', 'float']
+    for suffix, label, unit, value in features:
+        try:
+            data[f'{roi}-shape_ski-{suffix}'] = [value(), f'{label} ({roi})', unit, 'float']
+        except Exception as e:
+            logging.error("Error computing %s (%s): %s", label, roi, e)
 
     return data
 
 
 def shape_features(roi_vol, roi):
 
-    with tempfile.TemporaryDirectory() as tmp:
-        roi_file = os.path.join(tmp, 'roi.nii.gz')
-        img_file = os.path.join(tmp, 'img.nii.gz') # dummy
-        vreg.write_nifti(roi_vol, roi_file)
-        vreg.write_nifti(roi_vol, img_file)
-        # All features for water
-        extractor = featureextractor.RadiomicsFeatureExtractor()
-        extractor.disableAllFeatures()
-        extractor.enableFeatureClassByName('shape')
-        result = extractor.execute(img_file, roi_file)
-        
+    roi_img = _sitk_image(roi_vol.values, roi_vol.affine)
+    # All features for water
+    result = _get_shape_extractor().execute(roi_img, roi_img) # image is a dummy
+
     # Format return value
     rval = {}
     for p, v in result.items():
@@ -295,42 +382,50 @@ def shape_features(roi_vol, roi):
 
 def texture_features(roi_vol, img_vol, roi, img):
 
-    with tempfile.TemporaryDirectory() as tmp:
-        roi_file = os.path.join(tmp, 'roi.nii.gz')
-        img_file = os.path.join(tmp, 'img.nii.gz')
-        print('radiomics texture ', roi)
-        # Downsample large ROIs to avoid memory over
-        # TODO: Not enough for large regions - still RAM issue
-        roi_vol_box = roi_vol
-        img_vol_box = img_vol
-        # roi_vol_box = roi_vol.crop(mask=roi_vol) # some edits in vreg. Check
-        # img_vol_box = img_vol.crop(mask=roi_vol)
-        # roi_vol_box = roi_vol_box.resample(5.0)
-        # img_vol_box = img_vol_box.resample(5.0)
-        vreg.write_nifti(roi_vol_box, roi_file)
-        vreg.write_nifti(img_vol_box, img_file)
-        # All features for water
-        extractor = featureextractor.RadiomicsFeatureExtractor()
-        extractor.disableAllFeatures()
-        # TODO: try without first order
-        # classes = ['firstorder', 'glcm', 'glrlm', 'glszm', 'gldm', 'ngtdm'] # glcm seems to fail a lot
-        classes = ['firstorder', 'glrlm', 'glszm', 'gldm', 'ngtdm']
-        for cl in classes:
-            extractor.enableFeatureClassByName(cl)
-        # extractor.enableImageTypeByName('Wavelet')
-        # extractor.enableImageTypeByName('LoG', {'sigma': [1.0, 1.0, 1.0]}) 
-        # extractor.enableImageTypeByName('Gradient')
-        result = extractor.execute(img_file, roi_file)
+    print('radiomics texture ', roi)
+    # Crop both volumes to the ROI bounding box before extraction - texture
+    # matrix cost scales with the box volume, not the scan volume. A 5-voxel
+    # margin is kept for the pyradiomics padDistance, and the affine is
+    # shifted so the cropped volumes keep their scanner coordinates.
+    roi_values = np.asarray(roi_vol.values)
+    box = ndi.find_objects(np.asarray(roi_values != 0, dtype=np.uint8))[0]
+    box = tuple(
+        slice(max(s.start-5, 0), min(s.stop+5, n))
+        for s, n in zip(box, roi_values.shape)
+    )
+    affine = np.asarray(roi_vol.affine, dtype=float).copy()
+    affine[:3,3] += affine[:3,:3] @ [s.start for s in box]
+    roi_img = _sitk_image(roi_values[box], affine)
+    img_img = _sitk_image(np.asarray(img_vol.values)[box], affine)
+    # All features for water
+    result = _get_texture_extractor().execute(img_img, roi_img)
 
     # Format return value
     rval = {}
     for p, v in result.items():
         if p[:8] == 'original':
-            name = roi + '-' + img + '-' 
-            for cl in classes:
+            name = roi + '-' + img + '-'
+            for cl in _TEXTURE_CLASSES:
                 if cl in p:
                     name += p.replace(f'original_{cl}_', f'{cl}-')
                     break
             vals = [float(v), name, 'unit', 'float']
             rval[name] = vals
-    return rval
\ No newline at end of file
+    return rval
+
+
+def texture_features_batch(tasks, max_workers=None):
+    """Extract texture features for multiple ROIs in parallel.
+
+    Args:
+        tasks (list): (roi_vol, img_vol, roi, img) tuples, as accepted
+            by texture_features.
+        max_workers (int): maximum number of worker processes.
+
+    Returns:
+        list: one texture_features result per task, in task order.
+    """
+    # ROIs are independent, so fan out over worker processes
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(texture_features, *task) for task in tasks]
+        return [future.result() for future in futures]
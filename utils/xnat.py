@@ -173,9 +173,11 @@ def download_scans(
 
                 # Download the scan
                 os.makedirs(out_folder, exist_ok=True)
+                # Stream in 1 MiB chunks - scan zips are tens to hundreds
+                # of MB so small chunks just add per-call overhead
                 r = session.get(download_url, stream=True)
                 with open(out_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+                    for chunk in r.iter_content(chunk_size=1024*1024):
                         f.write(chunk)
 
 